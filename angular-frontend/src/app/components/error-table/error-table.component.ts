@@ -40,6 +40,11 @@ export class ErrorTableComponent {
     );
   });
 
+  // Rows are distinct messages; this counts the lines they stand for
+  readonly filteredTotal = computed(() =>
+    this.filtered().reduce((n, e) => n + (e.occurrences ?? 1), 0)
+  );
+
   readonly paged = computed(() => {
     const start = (this.currentPage() - 1) * this.pageSize;
     return this.filtered().slice(start, start + this.pageSize);
@@ -1,15 +1,18 @@
+// One distinct message: the line of its first occurrence, and how often it occurred
 export interface ErrorEntry {
   line_number: number;
   content: string;
   category: string;
   error_code: string | null;
   matched_pattern: string;
+  occurrences?: number;
 }
 
 export interface ScanResult {
   filename?: string;
   total_lines: number;
-  error_count: number;
+  error_count: number;      // every matched line
+  distinct_count?: number;  // distinct messages (rows of errors, before the row limit)
   errors: ErrorEntry[];
   categories: Record<string, number>;
   error_codes: Record<string, number>;
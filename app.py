@@ -1,5 +1,8 @@
+import hashlib
+import html
+import os
+import tempfile
 import streamlit as st
-import io
 import pandas as pd
 import plotly.express as px
 from langchain_core.documents import Document
@@ -7,12 +10,73 @@ from langchain_core.documents import Document
 from dotenv import load_dotenv
 
 from backend.retriever import retriever
-from backend.log_filter import ERROR_PATTERNS, categorize_error, extract_error_code, process_log_stream, create_download_link
+from backend.log_filter import (ERROR_PATTERNS, HAVE_PYARROW, categorize_error, extract_error_code, process_log_file,
+                                export_csv, export_parquet)
 
 # Load env variables (OPENROUTER_API_KEY etc.)
 load_dotenv()
 
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def analyze_upload(file_key, patterns_key, _uploaded_file):
+    """Scan an upload, cached by its content hash and the selected patterns
+
+    _uploaded_file is not hashed; it is only read on a cache miss. The
+    progress widgets are created here so a cache hit replays them as well.
+    """
+    # Create progress indicators
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    # Spool the upload to disk and scan it through a memory map
+    # (read as raw bytes, only matched lines are decoded)
+    with tempfile.NamedTemporaryFile(suffix='.log', delete=False) as tmp:
+        tmp.write(_uploaded_file.getbuffer())
+    try:
+        return process_log_file(tmp.name, list(patterns_key), progress_bar, status_text)
+    finally:
+        os.unlink(tmp.name)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def category_pie(category_counts):
+    """Pie chart of (category, count) pairs, built once per result"""
+    cat_df = pd.DataFrame(
+        list(category_counts), 
+        columns=['Category', 'Count']
+    ).sort_values('Count', ascending=False)
+    
+    fig = px.pie(
+        cat_df, 
+        values='Count', 
+        names='Category',
+        title='Error Categories Distribution',
+        hole=0.4
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def pattern_bar(pattern_counts):
+    """Bar chart of the top 10 (pattern, count) pairs, built once per result"""
+    pattern_df = pd.DataFrame(
+        list(pattern_counts), 
+        columns=['Pattern', 'Count']
+    ).sort_values('Count', ascending=False).head(10)
+    
+    fig = px.bar(
+        pattern_df,
+        x='Count',
+        y='Pattern',
+        orientation='h',
+        title='Top 10 Error Patterns',
+        color='Count'
+    )
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+
 def main():
     """Main Streamlit app"""
     
@@ -40,23 +104,21 @@ def main():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Select All", use_container_width=True):
-                st.session_state.selected_patterns = list(ERROR_PATTERNS.keys())
+                st.session_state.selected_patterns = set(ERROR_PATTERNS)
         with col2:
             if st.button("Clear All", use_container_width=True):
-                st.session_state.selected_patterns = []
+                st.session_state.selected_patterns = set()
         
-        # Pattern checkboxes
+        # Pattern checkboxes (a set, so membership checks are O(1))
         if 'selected_patterns' not in st.session_state:
-            st.session_state.selected_patterns = list(ERROR_PATTERNS.keys())
+            st.session_state.selected_patterns = set(ERROR_PATTERNS)
         
         for pattern, description in ERROR_PATTERNS.items():
             checked = pattern in st.session_state.selected_patterns
             if st.checkbox(f"{description}", value=checked, key=pattern):
-                if pattern not in st.session_state.selected_patterns:
-                    st.session_state.selected_patterns.append(pattern)
+                st.session_state.selected_patterns.add(pattern)
             else:
-                if pattern in st.session_state.selected_patterns:
-                    st.session_state.selected_patterns.remove(pattern)
+                st.session_state.selected_patterns.discard(pattern)
         
         st.markdown("---")
         
@@ -89,22 +151,12 @@ def main():
             if 'analysis_results' not in st.session_state:
                 st.session_state.analysis_results = None
             
-            # Create progress indicators
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
             try:
-                # Convert uploaded file to text stream
-                text_stream = io.TextIOWrapper(uploaded_file, encoding='utf-8', errors='ignore')
-                
-                # Process the file
+                # Re-analyzing the same file with the same patterns is a cache hit
+                file_key = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+                patterns_key = tuple(sorted(st.session_state.selected_patterns))
                 with st.spinner("Processing log file..."):
-                    errors, stats = process_log_stream(
-                        text_stream, 
-                        st.session_state.selected_patterns,
-                        progress_bar,
-                        status_text
-                    )
+                    errors, stats = analyze_upload(file_key, patterns_key, uploaded_file)
                 
                 # Store results in session state
                 st.session_state.analysis_results = {
@@ -167,41 +219,15 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                # Category distribution
+                # Category distribution (figures are cached per result, so
+                # reruns from filtering or paging don't rebuild them)
                 if stats['categories']:
-                    cat_df = pd.DataFrame(
-                        list(stats['categories'].items()), 
-                        columns=['Category', 'Count']
-                    ).sort_values('Count', ascending=False)
-                    
-                    fig = px.pie(
-                        cat_df, 
-                        values='Count', 
-                        names='Category',
-                        title='Error Categories Distribution',
-                        hole=0.4
-                    )
-                    fig.update_traces(textposition='inside', textinfo='percent+label')
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(category_pie(tuple(stats['categories'].items())), use_container_width=True)
             
             with col2:
                 # Top error patterns
                 if stats['pattern_matches']:
-                    pattern_df = pd.DataFrame(
-                        list(stats['pattern_matches'].items()), 
-                        columns=['Pattern', 'Count']
-                    ).sort_values('Count', ascending=False).head(10)
-                    
-                    fig = px.bar(
-                        pattern_df,
-                        x='Count',
-                        y='Pattern',
-                        orientation='h',
-                        title='Top 10 Error Patterns',
-                        color='Count'
-                    )
-                    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(pattern_bar(tuple(stats['pattern_matches'].items())), use_container_width=True)
             
             # Error codes table
             if stats['error_codes']:
@@ -220,9 +246,9 @@ def main():
             # Errors list with filtering
             st.markdown("### 📋 Detected Errors")
             
-            if errors:
-                # Create DataFrame for errors
-                errors_df = pd.DataFrame(errors)
+            if not errors.empty:
+                # Errors already come back as a DataFrame
+                errors_df = errors
                 
                 # Filter options
                 col1, col2 = st.columns([2, 1])
@@ -263,27 +289,22 @@ def main():
                 start_idx = (page_number - 1) * page_size
                 end_idx = min(start_idx + page_size, len(filtered_df))
                 
-                # Display errors
-                for idx, error in filtered_df.iloc[start_idx:end_idx].iterrows():
-                    with st.expander(f"Line {error['line_number']}: {error['content'][:100]}..."):
-                        col1, col2 = st.columns([3, 1])
-                        
-                        with col1:
-                            st.markdown(f"**Full Error:**")
-                            st.code(error['content'], language='text')
-                        
-                        with col2:
-                            st.markdown("**Metadata:**")
-                            st.markdown(f"""
-                            <div class="category-tag {error['category']}">
-                                {error['category'].upper()}
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            if error['error_code']:
-                                st.markdown(f"**Code:** `{error['error_code']}`")
-                            
-                            st.markdown(f"**Pattern:** {error['matched_pattern']}")
+                # Display errors as one HTML block (one widget per page, not
+                # an expander with five widgets per row)
+                page_df = filtered_df.iloc[start_idx:end_idx]
+                rows_html = []
+                for line_number, content, category, error_code, matched_pattern in zip(
+                    page_df['line_number'], page_df['content'], page_df['category'],
+                    page_df['error_code'], page_df['matched_pattern']
+                ):
+                    code_html = f"<b>Code:</b> <code>{html.escape(error_code)}</code><br>" if pd.notna(error_code) else ""
+                    rows_html.append(
+                        f"<details><summary>Line {line_number}: {html.escape(content[:100])}...</summary>"
+                        f"<b>Full Error:</b><pre>{html.escape(content)}</pre>"
+                        f'<div class="category-tag {category}">{category.upper()}</div>'
+                        f"{code_html}<b>Pattern:</b> {html.escape(matched_pattern)}</details>"
+                    )
+                st.markdown("\n".join(rows_html), unsafe_allow_html=True)
                 
                 # Export options
                 st.markdown("---")
@@ -294,9 +315,20 @@ def main():
                 with col1:
                     # Download CSV
                     if not filtered_df.empty:
-                        st.markdown(
-                            create_download_link(filtered_df, f"errors_{results['filename']}.csv"),
-                            unsafe_allow_html=True
+                        st.download_button(
+                            "📥 Download CSV",
+                            data=export_csv(filtered_df),
+                            file_name=f"errors_{results['filename']}.csv",
+                            mime="text/csv"
+                        )
+                    
+                    # Download Parquet (typed columns, much smaller than CSV)
+                    if not filtered_df.empty and HAVE_PYARROW:
+                        st.download_button(
+                            "📦 Download Parquet",
+                            data=export_parquet(filtered_df),
+                            file_name=f"errors_{results['filename']}.parquet",
+                            mime="application/vnd.apache.parquet"
                         )
                 
                 with col2:
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os 
+from functools import lru_cache
 from langchain_community.chat_models import ChatOpenAI
 
 LLM_MODEL = "openai/gpt-oss-20b:free"
@@ -8,7 +9,9 @@ LLM_BASE_URL = "https://openrouter.ai/api/v1"
 load_dotenv()
 TEMPERATURE = 0.2
 
+@lru_cache(maxsize=1)
 def llm_model():
+    # Reuse one client (and its connection pool) for every chat turn
     return ChatOpenAI(
         model=LLM_MODEL,
         base_url=LLM_BASE_URL,
@@ -1,11 +1,57 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SEPARATORS = ["\n", " "]
+
+def split_pieces(text, separator):
+    # Each piece after the first keeps the separator in front, and counts it
+    first, *rest = text.split(separator)
+    return [piece for piece in [first] + [separator + piece for piece in rest] if piece]
+
+def merge_pieces(pieces):
+    # Join consecutive pieces into chunks of up to CHUNK_SIZE characters; the
+    # next chunk starts on the trailing pieces totalling at most CHUNK_OVERLAP
+    chunks = []
+    first = 0
+    total = 0
+    for i, piece in enumerate(pieces):
+        if total + len(piece) > CHUNK_SIZE and i > first:
+            chunk = ''.join(pieces[first:i]).strip()
+            if chunk:
+                chunks.append(chunk)
+            while total > CHUNK_OVERLAP or (total + len(piece) > CHUNK_SIZE and total > 0):
+                total -= len(pieces[first])
+                first += 1
+        total += len(piece)
+    chunk = ''.join(pieces[first:]).strip()
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def split_text(text, separators):
+    # Split on the first separator the text contains; pieces too long for a
+    # chunk are split again on the next one, or kept whole after the last
+    separator, remaining = separators[-1], []
+    for i, candidate in enumerate(separators):
+        if candidate in text:
+            separator, remaining = candidate, separators[i + 1:]
+            break
+    chunks = []
+    pieces = []
+    for piece in split_pieces(text, separator):
+        if len(piece) < CHUNK_SIZE:
+            pieces.append(piece)
+            continue
+        chunks.extend(merge_pieces(pieces))
+        pieces = []
+        chunks.extend(split_text(piece, remaining) if remaining else [piece])
+    chunks.extend(merge_pieces(pieces))
+    return chunks
 
 def splitter(loaded_log):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size = 1000,
-        chunk_overlap = 200,
-        separators = ["\n"," "],
-    )
-    splits = text_splitter.split_documents([loaded_log])
-    return splits
-    
+    # Same chunks as RecursiveCharacterTextSplitter(chunk_size=1000,
+    # chunk_overlap=200, separators=["\n", " "]), from plain str splits and
+    # one merge pass instead of its regex splits and per-piece bookkeeping
+    return [Document(page_content=chunk, metadata=dict(loaded_log.metadata))
+            for chunk in split_text(loaded_log.page_content, SEPARATORS)]
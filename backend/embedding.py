@@ -1,12 +1,51 @@
+import os
+from functools import lru_cache
+
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
 from langchain_huggingface import HuggingFaceEmbeddings
 
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 MODEL_KWARGS = {'device': 'cpu'}
+# Larger batches amortize per-call overhead when embedding many chunks on CPU
+ENCODE_KWARGS = {'batch_size': 128}
+EMBEDDING_CACHE_DIR = "./embedding_cache"
+# The cache holds one small file (~8 KB) per distinct chunk. When the model is
+# loaded, the least recently used files beyond this many are deleted, which
+# keeps the cache to a few hundred MB.
+EMBEDDING_CACHE_MAX_FILES = 50_000
+
 
+def prune_embedding_cache(root=EMBEDDING_CACHE_DIR, max_files=EMBEDDING_CACHE_MAX_FILES):
+    # Cache hits refresh a file's access time (update_atime below), so
+    # the oldest access times are the least recently used vectors
+    files = [os.path.join(directory, name)
+             for directory, _, names in os.walk(root) for name in names]
+    if len(files) <= max_files:
+        return
+    files.sort(key=lambda path: os.stat(path).st_atime)
+    for path in files[:len(files) - max_files]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
+
+@lru_cache(maxsize=1)
 def embedding_data():
-    return HuggingFaceEmbeddings(
+    # Loading the model is slow; share one instance across uploads
+    model = HuggingFaceEmbeddings(
         model_name=MODEL_NAME,
         model_kwargs=MODEL_KWARGS,
+        encode_kwargs=ENCODE_KWARGS,
+    )
+    prune_embedding_cache()
+    # Chunks repeat across uploads (same stack traces, same 5xx lines), so
+    # vectors are cached on disk by content hash and only misses are embedded
+    return CacheBackedEmbeddings.from_bytes_store(
+        model,
+        LocalFileStore(EMBEDDING_CACHE_DIR, update_atime=True),
+        namespace=MODEL_NAME,
+        key_encoder="sha256",
     )
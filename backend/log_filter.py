@@ -1,12 +1,27 @@
 import io
+import mmap
+import multiprocessing
+import os
 import re
+import threading
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import time
+from array import array
 from collections import Counter
-import base64
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
 
 
 ERROR_PATTERNS = {
@@ -33,124 +48,525 @@ ERROR_PATTERNS = {
     r'\[alert\]': 'Alert',
 }
 
+# Lowercase literal every match of a pattern must contain. Lines containing
+# none of the selected keywords skip the full regex; patterns without an
+# entry are always run.
+PATTERN_KEYWORDS = {
+    r'\bERROR\b': 'error',
+    r'\bFAIL(ED)?\b': 'fail',
+    r'\bEXCEPTION\b': 'exception',
+    r'\bCRITICAL\b': 'critical',
+    r'\bFATAL\b': 'fatal',
+    r'\bPANIC\b': 'panic',
+    r'\bTIMEOUT\b': 'timeout',
+    r'\bDENIED\b': 'denied',
+    r'\bREJECTED\b': 'rejected',
+    r'\bABORT\b': 'abort',
+    r'\bSEGMENTATION FAULT\b': 'segmentation fault',
+    r'\bOUT OF MEMORY\b': 'out of memory',
+    r'\bSTACK TRACE\b': 'stack trace',
+    r'\bTRACEBACK\b': 'traceback',
+    r'\bUNHANDLED\b': 'unhandled',
+    r'HTTP/\d\.\d"\s(5\d\d|4\d\d)': 'http/',
+    r'\[error\]': '[error]',
+    r'\[emerg\]': '[emerg]',
+    r'\[crit\]': '[crit]',
+    r'\[alert\]': '[alert]',
+}
+
+# The prefilters (bytes keywords and regexes, Arrow's RE2) only know ASCII,
+# while the str patterns also match Unicode whitespace and case variants and
+# the \x1c-\x1f separators. Lines with any such character are always
+# candidates, and the exact union decides.
+UNUSUAL_CHARACTERS = r'[^\t\n\r\x20-\x7e]'
+
+CATEGORY_KEYWORDS = {
+    'database': ['database', 'sql', 'mysql', 'postgres', 'oracle', 'mongodb', 'query', 'transaction'],
+    'performance': ['timeout', 'slow', 'latency', 'performance', 'bottleneck', 'response time'],
+    'security': ['auth', 'authentication', 'login', 'password', 'permission', 'access', 'unauthorized', 'forbidden'],
+    'resource': ['memory', 'heap', 'disk', 'cpu', 'resource', 'out of memory', 'oom', 'disk full'],
+    'network': ['network', 'connection', 'socket', 'http', 'https', 'tcp', 'udp', 'connection refused'],
+    'io': ['file', 'io', 'read', 'write', 'permission denied', 'file not found', 'eof'],
+    'application': ['exception', 'null pointer', 'index out of bounds', 'type error', 'syntax error']
+}
+
+# Flat (keyword, category) table in category priority order, so the first
+# keyword found in a line gives the same category as the nested scan
+KEYWORD_CATEGORIES = tuple((keyword, category)
+                           for category, keywords in CATEGORY_KEYWORDS.items()
+                           for keyword in keywords)
+
+# Fixed category lists for the Categorical columns of the errors table
+CATEGORY_LIST = list(CATEGORY_KEYWORDS)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORY_LIST)}
+PATTERN_LIST = list(ERROR_PATTERNS.values())
+PATTERN_CODES = {desc: code for code, desc in enumerate(PATTERN_LIST)}
+
 def categorize_error(line):
     """Categorize error type with improved detection"""
-    line_lower = line.lower()
-    
-    category_keywords = {
-        'database': ['database', 'sql', 'mysql', 'postgres', 'oracle', 'mongodb', 'query', 'transaction'],
-        'performance': ['timeout', 'slow', 'latency', 'performance', 'bottleneck', 'response time'],
-        'security': ['auth', 'authentication', 'login', 'password', 'permission', 'access', 'unauthorized', 'forbidden'],
-        'resource': ['memory', 'heap', 'disk', 'cpu', 'resource', 'out of memory', 'oom', 'disk full'],
-        'network': ['network', 'connection', 'socket', 'http', 'https', 'tcp', 'udp', 'connection refused'],
-        'io': ['file', 'io', 'read', 'write', 'permission denied', 'file not found', 'eof'],
-        'application': ['exception', 'null pointer', 'index out of bounds', 'type error', 'syntax error']
-    }
-    
-    for category, keywords in category_keywords.items():
-        if any(keyword in line_lower for keyword in keywords):
+    return categorize_lowercase(line.lower())
+
+def categorize_lowercase(line_lower):
+    """categorize_error for a line that is already lowercased"""
+    for keyword, category in KEYWORD_CATEGORIES:
+        if keyword in line_lower:
             return category
     return 'application'
 
+def lowercase_pattern(pattern):
+    """Lowercase a regex for case-sensitive use on lowercased lines
+
+    Escapes are kept as they are, so \\B, \\D, \\S and \\W keep their meaning.
+    """
+    return re.sub(r'\\.|[^\\]+', lambda m: m.group() if m.group().startswith('\\') else m.group().lower(),
+                  pattern)
+
+# Compiled once at import; tried in priority order by extract_error_code
+HTTP_CODE_PATTERN = re.compile(r'\b([45]\d{2})\b')
+CODE_PATTERNS = [
+    re.compile(r'ERR[_-](\w+)', re.IGNORECASE), #ERR_123,ERR-DBFAIL
+    re.compile(r'ERROR[_-](\w+)', re.IGNORECASE), #ERROR_TIMEOUT,ERROR-401
+    re.compile(r'code[:\s]+(\w+)', re.IGNORECASE), #code: 404,code  DB_ERR
+    re.compile(r'error\s+code\s*[=:]\s*(\w+)', re.IGNORECASE), #error code = 500,error code:AUTH_FAIL
+    re.compile(r'\[(\w+)\]', re.IGNORECASE), #[ERROR123],[DB_FAIL]
+]
+
+# The same patterns for ASCII lines that are already lowercased; matching
+# case-sensitively lets the regex engine skip ahead on literal prefixes
+LOWERCASE_CODE_PATTERNS = [re.compile(lowercase_pattern(pattern.pattern)) for pattern in CODE_PATTERNS]
+
 def extract_error_code(line):
     """Extract error codes from log line"""
     # HTTP status codes
-    http_match = re.search(r'\b(\d{3})\b', line)
-    if http_match and http_match.group(1).startswith(('4', '5')):
+    http_match = HTTP_CODE_PATTERN.search(line)
+    if http_match:
+        return f"HTTP_{http_match.group(1)}" #This returns the error code like HTTP_404 OR HTTP_500
+
+    for pattern in CODE_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return match.group(1).upper()  #Finds pattern in the line
+    
+    return None
+
+def extract_lowercase_code(line_lower):
+    """extract_error_code for an ASCII line that is already lowercased"""
+    # HTTP status codes
+    http_match = HTTP_CODE_PATTERN.search(line_lower)
+    if http_match:
         return f"HTTP_{http_match.group(1)}" #This returns the error code like HTTP_404 OR HTTP_500
 
-    code_patterns = [
-        r'ERR[_-](\w+)', #ERR_123,ERR-DBFAIL
-        r'ERROR[_-](\w+)', #ERROR_TIMEOUT,ERROR-401
-        r'code[:\s]+(\w+)', #code: 404,code  DB_ERR
-        r'error\s+code\s*[=:]\s*(\w+)', #error code = 500,error code:AUTH_FAIL
-        r'\[(\w+)\]', #[ERROR123],[DB_FAIL]
-    ]
-    for pattern in code_patterns:
-        match = re.search(pattern, line, re.IGNORECASE)
+    for pattern in LOWERCASE_CODE_PATTERNS:
+        match = pattern.search(line_lower)
         if match:
             return match.group(1).upper()  #Finds pattern in the line
     
     return None
 
 
-def process_log_stream(text_stream, selected_patterns, progress_bar=None, status_text=None):
-    """Process log file stream with progress tracking"""
-    errors = []
-    stats = {
+def non_capturing(pattern):
+    """Rewrite a regex's capturing groups as non-capturing ones"""
+    # Escapes and character classes are copied as they are
+    return re.sub(r'(\\.|\[(?:\\.|[^\]])*\])|\((?!\?)', lambda m: m.group(1) or '(?:', pattern)
+
+
+def build_union(patterns, as_bytes=False, flags=re.IGNORECASE):
+    """Combine patterns into one alternation regex.
+
+    Consecutive whole-word patterns share a single word-boundary group so the
+    regex engine can still skip ahead on their first characters; a capturing
+    group per pattern would disable that optimization. The union has no
+    capturing groups at all, since only whether it matches is used.
+    """
+    parts = []
+    words = []
+    for pattern in map(non_capturing, patterns):
+        if pattern.startswith(r'\b') and pattern.endswith(r'\b'):
+            words.append(pattern[2:-2])
+            continue
+        if words:
+            parts.append(r'\b(?:%s)\b' % '|'.join(words))
+            words = []
+        parts.append(f'(?:{pattern})')
+    if words:
+        parts.append(r'\b(?:%s)\b' % '|'.join(words))
+
+    if not parts:
+        return None
+    union = '|'.join(parts)
+    return re.compile(union.encode() if as_bytes else union, flags)
+
+
+def build_matcher(selected_patterns):
+    """Build the regexes and prematch keywords for the selected patterns"""
+    # Order and duplicates don't matter, so any pattern set is cached once
+    return compile_matcher(frozenset(selected_patterns))
+
+
+@lru_cache(maxsize=32)
+def compile_matcher(selected_patterns):
+    """Compile the matcher for a frozenset of patterns (cached per set)"""
+    patterns = [pattern for pattern in ERROR_PATTERNS if pattern in selected_patterns]
+    # ASCII lines are lowercased once and checked case-sensitively
+    lowercase_patterns = [lowercase_pattern(pattern) for pattern in patterns]
+    compiled_patterns = tuple(COMPILED[pattern] for pattern in patterns)
+    lowercase_compiled = tuple(LOWERCASE_COMPILED[pattern] for pattern in patterns)
+    # The prefilter runs on raw bytes, so keywords and fallback are bytes too
+    keywords = tuple(dict.fromkeys(PATTERN_KEYWORDS[pattern].encode() for pattern in patterns
+                                   if pattern in PATTERN_KEYWORDS))
+    fallback = build_union([pattern for pattern in patterns if pattern not in PATTERN_KEYWORDS]
+                           + [UNUSUAL_CHARACTERS], as_bytes=True)
+    return (build_union(patterns), build_union(lowercase_patterns, flags=0), keywords, fallback,
+            compiled_patterns, lowercase_compiled)
+
+
+# Per-pattern regexes are compiled once at import and shared by every
+# selection; the matcher for the default (all patterns) is built up front
+COMPILED = {pattern: (re.compile(pattern, re.IGNORECASE), desc) for pattern, desc in ERROR_PATTERNS.items()}
+LOWERCASE_COMPILED = {pattern: (re.compile(lowercase_pattern(pattern)), desc)
+                      for pattern, desc in ERROR_PATTERNS.items()}
+compile_matcher(frozenset(ERROR_PATTERNS))
+
+
+def matched_description(compiled_patterns, line):
+    """Return the description of the first selected pattern (in order) that matches line"""
+    return next(desc for pattern, desc in compiled_patterns if pattern.search(line))
+
+
+def read_blocks(stream, block_size, size=None):
+    """Yield byte blocks of whole lines (each ending with a newline, except the last)
+
+    If size is given, at most that many bytes are read from the stream. Line
+    endings are passed through as they are (see normalize_newlines).
+    """
+    tail = b''
+    while True:
+        if size is not None:
+            block_size = min(block_size, size)
+            if not block_size:
+                break
+        chunk = stream.read(block_size)
+        if not chunk:
+            break
+        if size is not None:
+            size -= len(chunk)
+        chunk = tail + chunk
+        cut = chunk.rfind(b'\n') + 1
+        tail = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+    if tail:
+        yield tail
+
+
+def normalize_newlines(block):
+    """Translate CRLF and lone CR line endings to LF, like text-mode universal newlines"""
+    if b'\r' in block:
+        block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return block
+
+
+def find_candidate_lines(block, keywords, fallback):
+    """Return sorted start offsets of lines in block that may match a pattern.
+
+    The whole block is lowercased once (ASCII only, so offsets are kept) and
+    searched with bytes.find for each keyword, so lines without a keyword
+    are never decoded or seen at the Python level.
+    """
+    block_lower = block.lower()
+
+    starts = set()
+    for keyword in keywords:
+        pos = block_lower.find(keyword)
+        while pos != -1:
+            starts.add(block_lower.rfind(b'\n', 0, pos) + 1)
+            end = block_lower.find(b'\n', pos)
+            if end == -1:
+                break
+            pos = block_lower.find(keyword, end)
+
+    if fallback:
+        # Fallback matches may run across a newline; the per-line check
+        # afterwards keeps the result exact
+        match = fallback.search(block)
+        while match:
+            starts.add(block.rfind(b'\n', 0, match.start()) + 1)
+            end = block.find(b'\n', match.start())
+            if end == -1:
+                break
+            match = fallback.search(block, end + 1)
+
+    return sorted(starts)
+
+
+def candidate_lines(block, union, keywords, fallback):
+    """Yield (index, text) of the lines in block that may match a pattern.
+
+    With pyarrow the raw block is split into lines and matched against the
+    union in Arrow's RE2, all in one vectorized pass; otherwise
+    find_candidate_lines prefilters the raw bytes on keywords. Either way
+    only candidate lines are decoded, and the caller still checks each one
+    against the union itself.
+    """
+    if union is None:
+        return
+    if HAVE_PYARROW:
+        lines = pc.list_flatten(pc.split_pattern(pa.array([block], pa.binary()), b'\n'))
+        # Only the union is case-insensitive: RE2 case folds a negated class
+        # too, which would let 'ſ' or 'K' slip through
+        hits = pc.match_substring_regex(lines, f'(?i:{union.pattern})|{UNUSUAL_CHARACTERS}')
+        indices = np.flatnonzero(hits.to_numpy(zero_copy_only=False))
+        for index, line in zip(indices, lines.take(indices).to_pylist()):
+            yield int(index), line.decode('utf-8', errors='ignore')
+        return
+
+    line_index = 0
+    last_start = 0
+    for start in find_candidate_lines(block, keywords, fallback):
+        line_index += block.count(b'\n', last_start, start)
+        last_start = start
+        end = block.find(b'\n', start)
+        yield line_index, (block[start:end] if end != -1 else block[start:]).decode('utf-8', errors='ignore')
+
+
+BLOCK_SIZE = 1 << 20  # Bytes per block; progress is updated per block
+PARALLEL_MIN_BYTES = 16 << 20  # Smaller files are not worth starting worker processes for
+
+
+def new_stats():
+    """Return empty scan statistics"""
+    return {
         'total_lines': 0,
         'error_count': 0,
         'categories': Counter(),
         'error_codes': Counter(),
         'pattern_matches': Counter()
     }
+
+
+def update_progress(progress_bar, status_text, fraction, stats):
+    """Report scan progress to the optional Streamlit widgets"""
+    if progress_bar:
+        progress_bar.progress(min(fraction, 1.0))
+    if status_text:
+        status_text.text(f"Processed {stats['total_lines']:,} lines... Found {stats['error_count']:,} errors")
+
+
+def errors_frame(line_numbers, contents, category_codes, error_codes, pattern_codes):
+    """Build the errors DataFrame from the per-column arrays of a scan"""
+    return pd.DataFrame({
+        'line_number': np.asarray(line_numbers, dtype=np.int64),
+        'content': pd.Series(contents, dtype=object),
+        'category': pd.Categorical.from_codes(np.asarray(category_codes, dtype=np.int8), CATEGORY_LIST),
+        # Few distinct codes repeat over many rows; missing codes become NaN
+        'error_code': pd.Categorical(error_codes),
+        'matched_pattern': pd.Categorical.from_codes(np.asarray(pattern_codes, dtype=np.int8), PATTERN_LIST),
+    })
+
+
+def tally(codes, labels):
+    """Count an array of int8 codes as a Counter of labels, in first-seen order"""
+    codes = np.frombuffer(codes, dtype=np.int8)
+    counts = np.bincount(codes, minlength=len(labels))
+    seen, first = np.unique(codes, return_index=True)
+    return Counter({labels[code]: int(counts[code]) for code in seen[np.argsort(first)]})
+
+
+def scan_blocks(blocks, selected_patterns, on_block=None):
+    """Scan line-aligned byte blocks, calling on_block(stats) after each one.
+
+    Matches are collected column by column (typed arrays for numbers and
+    category codes) instead of one dict per error, and returned as a
+    DataFrame. The per-category, code and pattern counts are tallied from
+    those columns once the last block is done.
+    """
+    line_numbers = array('q')
+    contents = []
+    category_codes = array('b')
+    error_codes = []
+    pattern_codes = array('b')
+    stats = new_stats()
     
-    # Compile selected patterns
-    compiled_patterns = [(re.compile(pattern, re.IGNORECASE), desc) 
-                         for pattern, desc in ERROR_PATTERNS.items() 
-                         if pattern in selected_patterns]  #This stores regex and thier description in the compiled patterns
-                    
-    
-    # Read and process line by line
-    line_buffer = []
-    chunk_size = 10000  # Process in chunks for progress updates
+    # Compile selected patterns into a single alternation
+    (union, lowercase_union, keywords, fallback,
+     compiled_patterns, lowercase_compiled) = build_matcher(selected_patterns)
     
-    for line_num, line in enumerate(text_stream, 1):
-        line = line.rstrip('\n')
-        stats['total_lines'] += 1
-        
-        # Check if line matches any selected pattern
-        matched = False
-        matched_pattern = None
-        
-        for pattern, desc in compiled_patterns:
-            if pattern.search(line):
-                matched = True
-                matched_pattern = desc
-                stats['pattern_matches'][desc] += 1
-                break
-        
-        if matched:
-            stats['error_count'] += 1
-            
-            # Categorize error
-            category = categorize_error(line)
-            stats['categories'][category] += 1
-            
-            # Extract error code
-            error_code = extract_error_code(line)
-            if error_code:
-                stats['error_codes'][error_code] += 1
+    # Only look at lines that may match
+    for block in blocks:
+        for line_index, line in candidate_lines(block, union, keywords, fallback):
+            # Check if line matches any selected pattern (one regex scan).
+            # Lowercasing is only exact for ASCII (str.lower() can change the
+            # length of other text), so only ASCII lines share one lowercased copy
+            if line.isascii():
+                line_lower = line.lower()
+                if not lowercase_union.search(line_lower):
+                    continue
+                matched_pattern = matched_description(lowercase_compiled, line_lower)
+                category = categorize_lowercase(line_lower)
+                error_code = extract_lowercase_code(line_lower)
+            else:
+                if not union.search(line):
+                    continue
+                matched_pattern = matched_description(compiled_patterns, line)
+                category = categorize_error(line)
+                error_code = extract_error_code(line)
             
             # Store error details
-            errors.append({
-                'line_number': line_num,
-                'content': line,
-                'category': category,
-                'error_code': error_code,
-                'matched_pattern': matched_pattern
-            })
+            line_numbers.append(stats['total_lines'] + line_index + 1)
+            contents.append(line)
+            category_codes.append(CATEGORY_CODES[category])
+            error_codes.append(error_code)
+            pattern_codes.append(PATTERN_CODES[matched_pattern])
         
-        # Store line for context (keep last few lines)
-        line_buffer.append(line)
-        if len(line_buffer) > 10:
-            line_buffer.pop(0)
+        stats['total_lines'] += block.count(b'\n') + (0 if block.endswith(b'\n') else 1)
+        stats['error_count'] = len(line_numbers)
         
-        # Update progress every chunk_size lines
-        if line_num % chunk_size == 0:
-            if progress_bar:
-                progress_bar.progress(min(line_num / 1000000, 1.0))  # Cap at 1M lines for progress
-            if status_text:
-                status_text.text(f"Processed {line_num:,} lines... Found {stats['error_count']:,} errors")
+        if on_block:
+            on_block(stats)
     
+    stats['categories'] = tally(category_codes, CATEGORY_LIST)
+    stats['error_codes'] = Counter(filter(None, error_codes))
+    stats['pattern_matches'] = tally(pattern_codes, PATTERN_LIST)
+    errors = errors_frame(line_numbers, contents, category_codes, error_codes, pattern_codes)
     return errors, stats
 
-def create_download_link(df, filename="errors_export.csv"):
-    """Create a download link for DataFrame"""
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">📥 Download CSV</a>'
-    return href
+
+def process_log_stream(stream, selected_patterns, progress_bar=None, status_text=None, total_bytes=None):
+    """Process a binary log file stream with progress tracking.
+
+    Progress is the share of total_bytes read so far when the stream size is
+    known, otherwise it runs against a 1M line cap.
+    """
+    def on_block(stats):
+        if total_bytes:
+            fraction = stream.tell() / total_bytes
+        else:
+            fraction = stats['total_lines'] / 1000000  # Cap at 1M lines for progress
+        update_progress(progress_bar, status_text, fraction, stats)
+    
+    return scan_blocks(map(normalize_newlines, read_blocks(stream, BLOCK_SIZE)), selected_patterns, on_block)
+
+
+def split_ranges(mm, parts):
+    """Split a mapped file into up to parts byte ranges ending on line boundaries"""
+    size = len(mm)
+    bounds = [0]
+    for i in range(1, parts):
+        cut = mm.find(b'\n', max(size * i // parts, bounds[-1])) + 1
+        if cut == 0:
+            break
+        if cut > bounds[-1]:
+            bounds.append(cut)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def worker_pool():
+    """Return the process pool for parallel scans, started on first use and then reused.
+
+    Workers are started from a forkserver (spawn where there is none), never
+    forked from this process: its other threads (script runs, servers, model
+    code) may hold locks at fork time that the child could never release.
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _worker_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                               mp_context=multiprocessing.get_context(method))
+        return _worker_pool
+
+
+def discard_worker_pool(pool):
+    """Drop a broken pool so the next parallel scan starts a new one"""
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is pool:
+            _worker_pool = None
+    pool.shutdown(wait=False)
+
+
+def scan_chunk(path, start, end, selected_patterns):
+    """Scan bytes start..end of a log file (runs in a worker process)"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        return scan_blocks(map(normalize_newlines, read_blocks(mm, BLOCK_SIZE, end - start)), selected_patterns)
+
+
+def process_log_file(path, selected_patterns, progress_bar=None, status_text=None):
+    """Process a log file on disk through a read-only memory map.
+
+    Large files are split on line boundaries and scanned in parallel, one
+    range per worker process; results are merged back in file order.
+    """
+    workers = os.cpu_count() or 1
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # Empty files cannot be mapped
+            return process_log_stream(f, selected_patterns, progress_bar, status_text)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # With no patterns selected the scan only counts newlines, which
+            # is not worth starting worker processes for
+            if workers == 1 or size < PARALLEL_MIN_BYTES or not selected_patterns:
+                return process_log_stream(mm, selected_patterns, progress_bar, status_text, size)
+            # A few ranges per worker keeps cores busy and progress moving
+            ranges = split_ranges(mm, workers * 4)
+    
+    selected_patterns = list(selected_patterns)
+    results = [None] * len(ranges)
+    progress = new_stats()
+    done_bytes = 0
+    executor = worker_pool()
+    try:
+        futures = {executor.submit(scan_chunk, path, start, end, selected_patterns): i
+                   for i, (start, end) in enumerate(ranges)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            start, end = ranges[i]
+            done_bytes += end - start
+            progress['total_lines'] += results[i][1]['total_lines']
+            progress['error_count'] += results[i][1]['error_count']
+            update_progress(progress_bar, status_text, done_bytes / size, progress)
+    except BrokenProcessPool:
+        discard_worker_pool(executor)
+        raise
+    
+    # Chunk line numbers start at 1; shift them by the lines before each chunk
+    frames = []
+    stats = new_stats()
+    for chunk_errors, chunk_stats in results:
+        chunk_errors['line_number'] += stats['total_lines']
+        frames.append(chunk_errors)
+        stats['total_lines'] += chunk_stats['total_lines']
+        stats['error_count'] += chunk_stats['error_count']
+        for key in ('categories', 'error_codes', 'pattern_matches'):
+            stats[key] += chunk_stats[key]
+    
+    errors = pd.concat(frames, ignore_index=True)
+    # Chunks find different error codes, so concat falls back to object
+    errors['error_code'] = errors['error_code'].astype('category')
+    return errors, stats
+
+def export_csv(df):
+    """Serialize a DataFrame to CSV bytes for a download button"""
+    # Write straight into a byte buffer; no intermediate str or base64 copy
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+
+def export_parquet(df):
+    """Serialize a DataFrame to zstd-compressed Parquet bytes (needs pyarrow)"""
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False, compression='zstd')
+    return buf.getvalue()
 
 
         
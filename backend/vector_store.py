@@ -1,15 +1,156 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
 from backend.chunking import splitter
 from backend.embedding import embedding_data
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+PERSIST_DIRECTORY = "./chroma_db"
+# Below this many chunks an exact scan of one matrix beats building HNSW
+BRUTE_FORCE_MAX_CHUNKS = 50_000
+
+# Stores already opened or built in this process, keyed by content digest.
+# Least recently used stores are dropped so a long-running server doesn't
+# keep every log it has ever seen in memory.
+LOADED_STORES = OrderedDict()
+MAX_LOADED_STORES = 8
+# Streamlit sessions and the API's RAG thread share LOADED_STORES
+LOADED_STORES_LOCK = threading.Lock()
+
+def normalized_rows(vectors, rows):
+    # Unit-length rows, so cosine similarity is a plain dot product
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(rows, -1 if rows else 0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class MatrixStore(VectorStore):
+    """Exact top-k cosine search over an in-memory embedding matrix
+
+    Scores from similarity_search_with_score are cosine distances (lower is
+    closer); relevance scores are the cosine similarity.
+    """
+
+    def __init__(self, embedding, documents, vectors):
+        self._embedding = embedding
+        self.documents = documents
+        # Normalize once so a query is a single matrix-vector product
+        self.matrix = normalized_rows(vectors, len(documents))
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding, [], [])
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        documents = [Document(id=id_, page_content=text, metadata=metadata)
+                     for id_, text, metadata in zip(ids, texts, metadatas)]
+        vectors = normalized_rows(self._embedding.embed_documents(texts), len(texts))
+        # Documents grow before the matrix, so a concurrent search never
+        # finds a row without its document
+        self.documents = self.documents + documents
+        self.matrix = np.vstack([self.matrix, vectors]) if len(self.matrix) else vectors
+        return ids
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [document for document, _ in self.search_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.search_by_vector(self._embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    def search_by_vector(self, embedding, k):
+        # The k nearest documents with their cosine distances, nearest first
+        matrix = self.matrix
+        if not len(matrix):
+            return []
+        # A copy: normalizing must not change the caller's vector
+        query = np.array(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = matrix @ query
+        k = min(k, len(scores))
+        # Partial selection of the k best, then order just those
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], 1.0 - float(scores[i])) for i in top]
+
+
+def remember(key, vector_store):
+    # Keep the store as most recently used, evicting the oldest beyond the cap
+    with LOADED_STORES_LOCK:
+        LOADED_STORES[key] = vector_store
+        LOADED_STORES.move_to_end(key)
+        while len(LOADED_STORES) > MAX_LOADED_STORES:
+            LOADED_STORES.popitem(last=False)
+
+
+def loaded_store(key):
+    # The store already loaded for key (now most recently used), or None
+    with LOADED_STORES_LOCK:
+        vector_store = LOADED_STORES.get(key)
+        if vector_store is not None:
+            LOADED_STORES.move_to_end(key)
+        return vector_store
+
 
 def vector(loaded_log):
-    splits = splitter(loaded_log)
+    # One persisted index per distinct log content, so re-analysing the
+    # same errors reuses the stored embeddings instead of recomputing them
+    key = hashlib.sha256(loaded_log.page_content.encode()).hexdigest()
+    vector_store = loaded_store(key)
+    if vector_store is not None:
+        return vector_store
+
+    persist_directory = os.path.join(PERSIST_DIRECTORY, key)
     embeddings = embedding_data()
 
-    vector_store = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
-        persist_directory="./chroma_db"
-    )
+    if os.path.isdir(persist_directory):
+        vector_store = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+        )
+        remember(key, vector_store)
+        return vector_store
+
+    splits = splitter(loaded_log)
+    if len(splits) < BRUTE_FORCE_MAX_CHUNKS:
+        # Small corpus: skip index construction; the chunk vectors come from
+        # the embedding cache when this content has been seen before
+        vector_store = MatrixStore.from_documents(splits, embeddings)
+        remember(key, vector_store)
+        return vector_store
+
+    try:
+        vector_store = Chroma.from_documents(
+            documents=splits,
+            embedding=embeddings,
+            persist_directory=persist_directory
+        )
+    except Exception:
+        # Don't leave a half-built index behind to be reused
+        shutil.rmtree(persist_directory, ignore_errors=True)
+        raise
+    remember(key, vector_store)
     return vector_store
 
@@ -4,25 +4,36 @@ Run: uvicorn fastapi_backend.api:app --reload
 """
 
 import re
-import io
 import os
+import mmap
+import shutil
+import contextlib
+import tempfile
 import threading
+from array import array
 from pathlib import Path
 from collections import Counter
-from typing import Optional
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import BinaryIO, Iterable, Optional, TextIO
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import orjson
+from fastapi import FastAPI, File, UploadFile, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from langchain_core.documents import Document
 
-from backend.retriever import retriever
-from backend.query     import query
+from backend.log_filter import (BLOCK_SIZE, PATTERN_KEYWORDS, UNUSUAL_CHARACTERS, build_union,
+                                discard_worker_pool, find_candidate_lines, read_blocks, split_ranges,
+                                worker_pool)
 
 # ── Persistent upload directory ────────────────────────────────────────────────
 UPLOAD_DIR = Path("./uploaded_logs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Uploads at least this large are scanned by one worker process per core
+_PARALLEL_MIN_BYTES = 16 << 20
+
 # ── Error patterns ─────────────────────────────────────────────────────────────
 ERROR_PATTERNS = {
     r'\bERROR\b'                   : 'General Error',
@@ -58,6 +69,13 @@ CATEGORY_KEYWORDS = {
     'application': ['exception','null pointer','index out of bounds','type error','syntax error'],
 }
 
+# Compiled once at import; scans only pick the selected entries
+_COMPILED = {p: (re.compile(p, re.IGNORECASE), desc) for p, desc in ERROR_PATTERNS.items()}
+
+# Flat (keyword, category) pairs in category priority order: the first keyword
+# found gives the same category as checking each category's list in turn
+_KEYWORD_CATEGORIES = tuple((k, cat) for cat, kws in CATEGORY_KEYWORDS.items() for k in kws)
+
 # ── Global state ───────────────────────────────────────────────────────────────
 _state: dict = {
     "qa_chain"   : None,
@@ -69,68 +87,112 @@ _state: dict = {
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
+_DIGITS = re.compile(r'\d+')
+# Numbers and long hex ids (timestamps, request ids, addresses) that make
+# otherwise identical error lines differ
+_MESSAGE_NOISE = re.compile(r'\b[0-9a-f]{8,}\b|\d+', re.IGNORECASE)
+
+
 def _categorize(line: str) -> str:
+    # No category keyword contains a digit, so lines that differ only in
+    # timestamps, ids or counts share one cache entry
+    return _categorize_template(_DIGITS.sub('#', line))
+
+
+@lru_cache(maxsize=65536)
+def _categorize_template(line: str) -> str:
     ll = line.lower()
-    for cat, kws in CATEGORY_KEYWORDS.items():
-        if any(k in ll for k in kws):
+    for k, cat in _KEYWORD_CATEGORIES:
+        if k in ll:
             return cat
     return 'application'
 
 
+# Same rule as the Streamlit scanner: the first standalone 4xx/5xx number
+_HTTP_CODE     = re.compile(r'\b([45]\d{2})\b')
+_CODE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'ERR[_-](\w+)', r'ERROR[_-](\w+)', r'code[:\s]+(\w+)',
+    r'error\s+code\s*[=:]\s*(\w+)', r'\[(\w+)\]',
+))
+
+
 def _extract_code(line: str) -> Optional[str]:
-    m = re.search(r'\b(\d{3})\b', line)
-    if m and m.group(1).startswith(('4', '5')):
+    m = _HTTP_CODE.search(line)
+    if m:
         return f"HTTP_{m.group(1)}"
-    for p in [r'ERR[_-](\w+)', r'ERROR[_-](\w+)', r'code[:\s]+(\w+)',
-              r'error\s+code\s*[=:]\s*(\w+)', r'\[(\w+)\]']:
-        mm = re.search(p, line, re.IGNORECASE)
+    for pat in _CODE_PATTERNS:
+        mm = pat.search(line)
         if mm:
             return mm.group(1).upper()
     return None
 
 
-def _stream_scan_bytes(raw_bytes: bytes, selected_patterns: list) -> dict:
+@lru_cache(maxsize=32)
+def _matcher(selected: frozenset) -> tuple:
+    """
+    Everything the scan needs for one pattern selection, built once per set:
+    the per-pattern regexes (in ERROR_PATTERNS order), their union, the
+    prefilter keywords and the bytes fallback regex for keyword-less patterns.
+    """
+    patterns = [p for p in ERROR_PATTERNS if p in selected]
+    compiled = tuple(_COMPILED[p] for p in patterns)
+    keywords = tuple(dict.fromkeys(PATTERN_KEYWORDS[p].encode() for p in patterns if p in PATTERN_KEYWORDS))
+    fallback = build_union([p for p in patterns if p not in PATTERN_KEYWORDS] + [UNUSUAL_CHARACTERS],
+                           as_bytes=True)
+    return compiled, build_union(patterns), keywords, fallback
+
+
+# /upload always scans with every pattern; build that matcher at import
+_matcher(frozenset(ERROR_PATTERNS))
+
+
+def _message_key(content: str, category: str, error_code: Optional[str], matched_pattern: str) -> tuple:
     """
-    Stream-scan raw bytes line-by-line in memory.
-    The full file is never written to disk — only matched error lines are saved.
+    Identity of an error for de-duplication: the line with numbers and long
+    hex ids masked, plus everything derived from it.
     """
-    compiled = [
-        (re.compile(p, re.IGNORECASE), desc)
-        for p, desc in ERROR_PATTERNS.items()
-        if p in selected_patterns
-    ]
+    return (_MESSAGE_NOISE.sub("#", content), category, error_code, matched_pattern)
+
+
+def _new_columns() -> dict:
+    """Empty column store for errors: one array/list per field, a row per error."""
+    return {
+        "line_number"    : array("q"),
+        "content"        : [],
+        "category"       : [],
+        "error_code"     : [],
+        "matched_pattern": [],
+        "occurrences"    : array("q"),
+    }
 
-    errors       = []
+
+def _rows(columns: dict, limit: int) -> list:
+    """The first `limit` errors of a column store as dicts (the API shape)."""
+    fields = list(columns)
+    return [dict(zip(fields, row)) for row in zip(*(col[:limit] for col in columns.values()))]
+
+
+def _summary(errors: dict, total_lines: int) -> dict:
+    """
+    Scan result for de-duplicated errors. Each row of `errors` is a distinct
+    message (line_number is its first occurrence, "occurrences" its count);
+    distinct_count is the number of rows, while error_count and the tallies
+    count every occurrence.
+    """
     categories   = Counter()
     codes        = Counter()
     pattern_hits = Counter()
-    total_lines  = 0
-
-    stream = io.StringIO(raw_bytes.decode("utf-8", errors="replace"))
-    for line in stream:
-        total_lines += 1
-        line = line.rstrip("\n")
-
-        for pat, desc in compiled:
-            if pat.search(line):
-                cat  = _categorize(line)
-                code = _extract_code(line)
-                errors.append({
-                    "line_number"    : total_lines,
-                    "content"        : line,
-                    "category"       : cat,
-                    "error_code"     : code,
-                    "matched_pattern": desc,
-                })
-                categories[cat]    += 1
-                pattern_hits[desc] += 1
-                if code:
-                    codes[code] += 1
-                break
+    for cat, code, desc, n in zip(errors["category"], errors["error_code"],
+                                  errors["matched_pattern"], errors["occurrences"]):
+        categories[cat]    += n
+        pattern_hits[desc] += n
+        if code:
+            codes[code] += n
 
     return {
         "total_lines"    : total_lines,
-        "error_count"    : len(errors),
+        "error_count"    : sum(pattern_hits.values()),
+        "distinct_count" : len(errors["occurrences"]),
         "errors"         : errors,
         "categories"     : dict(categories),
         "error_codes"    : dict(codes),
@@ -138,12 +200,183 @@ def _stream_scan_bytes(raw_bytes: bytes, selected_patterns: list) -> dict:
     }
 
 
+def _scan_blocks(blocks: Iterable[bytes], selected_patterns: list, out: Optional[TextIO] = None) -> dict:
+    """
+    Scan blocks of whole lines, visiting only lines that can contain an error.
+    The full file is never written to disk — only matched error lines are saved,
+    written to `out` (newline-separated) as they are found.
+    Repeats of the same message are folded into its first row's
+    "occurrences" count. Errors are returned as columns (see _new_columns);
+    _rows turns the ones sent to a client into dicts.
+    """
+    compiled, union, keywords, fallback = _matcher(frozenset(selected_patterns))
+
+    errors      = _new_columns()   # first occurrence of each distinct message
+    occurrences = errors["occurrences"]
+    seen        = {}               # _message_key -> its row in errors
+    wrote       = False
+    total_lines = 0
+
+    for block in blocks:
+        # Visit only lines containing a pattern keyword (or a fallback regex
+        # hit); each is decoded and checked with the full union regex
+        line_number = total_lines + 1
+        line_start  = 0
+        for start in (find_candidate_lines(block, keywords, fallback) if union else ()):
+            end = block.find(b"\n", start)
+            if end == -1:
+                end = len(block)
+            line_number += block.count(b"\n", line_start, start)
+            line_start   = start
+            line         = block[start:end].decode("utf-8", errors="replace")
+
+            if not union.search(line):
+                continue
+
+            # Credit the first selected pattern (in order) that matches
+            desc = next(d for pat, d in compiled if pat.search(line))
+            if out is not None:
+                if wrote:
+                    out.write("\n")
+                out.write(line)
+                wrote = True
+            category = _categorize(line)
+            code     = _extract_code(line)
+            key      = _message_key(line, category, code, desc)
+            row      = seen.get(key)
+            if row is not None:
+                occurrences[row] += 1
+                continue
+            seen[key] = len(occurrences)
+            errors["line_number"].append(line_number)
+            errors["content"].append(line)
+            errors["category"].append(category)
+            errors["error_code"].append(code)
+            errors["matched_pattern"].append(desc)
+            occurrences.append(1)
+
+        # Lines end at "\n"; a trailing newline does not start another line
+        total_lines += block.count(b"\n") + (0 if not block or block.endswith(b"\n") else 1)
+
+    return _summary(errors, total_lines)
+
+
+def _stream_scan_file(f: BinaryIO, selected_patterns: list, out: Optional[TextIO] = None) -> dict:
+    """Stream-scan a binary file object in 1 MiB blocks (flat memory use)."""
+    return _scan_blocks(read_blocks(f, BLOCK_SIZE), selected_patterns, out)
+
+
+def _scan_range(path: str, start: int, end: int, selected_patterns: list, out_path: Optional[str] = None) -> dict:
+    """Worker process: scan bytes start..end of a file (error lines to out_path, if given)."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        blocks = read_blocks(f, BLOCK_SIZE, end - start)
+        if out_path is None:
+            return _scan_blocks(blocks, selected_patterns)
+        with open(out_path, "w", encoding="utf-8", newline="") as out:
+            return _scan_blocks(blocks, selected_patterns, out)
+
+
+def _parallel_scan(path: str, selected_patterns: list, out: Optional[TextIO] = None) -> dict:
+    """
+    Scan newline-aligned byte ranges of a file in the shared worker pool,
+    then merge the partial results in file order (error lines go to `out`).
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = split_ranges(mm, (os.cpu_count() or 1) * 4)
+    # Part files (one per range) are only needed when error lines are written
+    parts = tempfile.TemporaryDirectory() if out is not None else contextlib.nullcontext()
+    with parts as parts_dir:
+        part_paths = ([os.path.join(parts_dir, f"{i}.log") for i in range(len(ranges))] if parts_dir
+                      else [None] * len(ranges))
+        pool = worker_pool()
+        try:
+            partials = list(pool.map(_scan_range, *zip(*[(path, a, b, selected_patterns, part_path)
+                                                         for (a, b), part_path in zip(ranges, part_paths)])))
+        except BrokenProcessPool:
+            discard_worker_pool(pool)
+            raise
+
+        errors      = _new_columns()
+        seen        = {}
+        wrote       = False
+        total_lines = 0
+        for part, part_path in zip(partials, part_paths):
+            # Range-local line numbers start at 1; shift by the lines before it.
+            # A message already seen in an earlier range only adds its count.
+            cols = part["errors"]
+            for i, key in enumerate(map(_message_key, cols["content"], cols["category"],
+                                        cols["error_code"], cols["matched_pattern"])):
+                row = seen.get(key)
+                if row is not None:
+                    errors["occurrences"][row] += cols["occurrences"][i]
+                    continue
+                seen[key] = len(errors["occurrences"])
+                for field, col in cols.items():
+                    errors[field].append(col[i])
+                errors["line_number"][-1] += total_lines
+            total_lines += part["total_lines"]
+
+            if out is not None and part["error_count"]:
+                if wrote:
+                    out.write("\n")
+                with open(part_path, encoding="utf-8", newline="") as part_file:
+                    shutil.copyfileobj(part_file, out)
+                wrote = True
+
+    return _summary(errors, total_lines)
+
+
+def _stream_scan_upload(f: BinaryIO, selected_patterns: list, out: Optional[TextIO] = None) -> dict:
+    """
+    Scan an uploaded file object, writing error lines to `out`. Large uploads
+    on multi-core hosts are copied to a temp file so worker processes can
+    each scan a slice of it.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    # With no patterns the scan only counts lines; not worth worker processes
+    if size < _PARALLEL_MIN_BYTES or (os.cpu_count() or 1) == 1 or not selected_patterns:
+        return _stream_scan_file(f, selected_patterns, out)
+
+    with tempfile.NamedTemporaryFile(suffix=".log") as tmp:
+        shutil.copyfileobj(f, tmp, 1 << 20)
+        tmp.flush()
+        return _parallel_scan(tmp.name, selected_patterns, out)
+
+
+def _stream_scan_path(path: str, selected_patterns: list) -> dict:
+    """
+    Scan a file already on disk through a read-only mmap: blocks are copied
+    out of the page cache as the scan reaches them, never the whole file.
+    Large files on multi-core hosts are scanned in parallel.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return _stream_scan_bytes(b"", selected_patterns)
+    if size >= _PARALLEL_MIN_BYTES and (os.cpu_count() or 1) > 1 and selected_patterns:
+        return _parallel_scan(path, selected_patterns)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _stream_scan_file(mm, selected_patterns)
+
+
+def _stream_scan_bytes(raw_bytes: bytes, selected_patterns: list) -> dict:
+    """Scan raw bytes already in memory."""
+    return _scan_blocks([raw_bytes], selected_patterns)
+
+
 def _build_rag_in_background(error_lines: list, filename: str) -> None:
     """
     Background thread.
     Vectorises only the matched error lines — not the full file.
     This matches the original Streamlit behaviour exactly.
     """
+    # Imported on first use: scan worker processes import this module and
+    # should not load the embedding and LLM stack as well
+    from backend.retriever import retriever
+
     _state["rag_status"] = "building"
     _state["qa_chain"]   = None
     try:
@@ -176,6 +409,15 @@ class QueryRequest(BaseModel):
 class RescanRequest(BaseModel):
     patterns: list[str]
 
+# ── Responses ──────────────────────────────────────────────────────────────────
+
+def _json_response(payload: dict) -> Response:
+    """
+    Serialize a scan result with orjson. Returning a Response skips FastAPI's
+    jsonable_encoder walk over every error record as well as json.dumps.
+    """
+    return Response(orjson.dumps(payload), media_type="application/json")
+
 # ── Endpoints ──────────────────────────────────────────────────────────────────
 
 @app.get("/patterns")
@@ -184,56 +426,64 @@ def get_patterns():
 
 
 @app.post("/upload")
-async def upload_log(file: UploadFile = File(...)):
+def upload_log(file: UploadFile = File(...)):
     """
     1. Save the uploaded file to ./uploaded_logs/<filename>  (persists on disk).
     2. Stream-scan from disk line-by-line  →  fast, ~10-15 s for 57 MB.
-    3. Build RAG index in background from error lines only.
+    3. Build RAG index in background from distinct error lines only.
     4. Return scan results immediately.
     """
-    # ── Stream-scan from raw bytes in memory (never write the full file) ───────
+    # ── Stream-scan the spooled upload in blocks (never load the full file) ───
+    # Plain def: the blocking reads and the scan run in FastAPI's threadpool
     safe_name = Path(file.filename).name
-    raw_bytes = await file.read()
 
     _state["filename"]   = safe_name
     _state["rag_status"] = "building"
     _state["rag_error"]  = None
 
-    # Scan the full file in memory
-    result = _stream_scan_bytes(raw_bytes, list(ERROR_PATTERNS.keys()))
+    # Scan the full file, saving ONLY the error lines to disk as they're found
+    # (into a temp file moved into place once the scan succeeds, so a failed
+    # upload never truncates the file a /rescan may be reading)
+    saved_path = UPLOAD_DIR / safe_name
+    out = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=UPLOAD_DIR, suffix=".part", delete=False)
+    try:
+        with out:
+            result = _stream_scan_upload(file.file, list(ERROR_PATTERNS.keys()), out)
+        os.replace(out.name, saved_path)
+    except Exception:
+        os.unlink(out.name)
+        raise
     result["filename"]   = safe_name
     result["rag_status"] = "building"
-
-    # ── Save ONLY the error lines to disk ─────────────────────────────────────
-    error_lines = [e["content"] for e in result["errors"]]
-    saved_path  = UPLOAD_DIR / safe_name
-    saved_path.write_text("\n".join(error_lines), encoding="utf-8")
     _state["saved_path"] = saved_path
+
+    # Repeated messages are already collapsed, so each is embedded once
+    error_lines = result["errors"]["content"]
     threading.Thread(
         target=_build_rag_in_background,
         args=(error_lines, safe_name),
         daemon=True,
     ).start()
 
-    result["errors"] = result["errors"][:500]
-    return result
+    result["errors"] = _rows(result["errors"], 500)
+    return _json_response(result)
 
 
 @app.post("/rescan")
 def rescan(req: RescanRequest):
     """
     Re-scan the saved error-lines file with a custom pattern subset.
-    Since only error lines were saved, this is fast and lightweight.
+    Since only error lines were saved, this is fast and lightweight; the
+    file is scanned from disk rather than read into memory first.
     """
     saved_path = _state.get("saved_path")
     if not saved_path or not Path(saved_path).exists():
         raise HTTPException(400, "No log file on disk. Upload a file first.")
 
-    raw_bytes = Path(saved_path).read_bytes()
-    result = _stream_scan_bytes(raw_bytes, req.patterns)
+    result = _stream_scan_path(str(saved_path), req.patterns)
     result["filename"] = _state["filename"]
-    result["errors"]   = result["errors"][:500]
-    return result
+    result["errors"]   = _rows(result["errors"], 500)
+    return _json_response(result)
 
 
 @app.get("/rag-status")
@@ -262,6 +512,8 @@ def query_log(req: QueryRequest):
         raise HTTPException(202, "RAG index is still building — please wait a moment.")
     if _state["qa_chain"] is None:
         raise HTTPException(400, "No log uploaded yet.")
+    from backend.query import query
+
     try:
         return query(_state["qa_chain"], req.question)
     except Exception as e:
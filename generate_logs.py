@@ -1,8 +1,10 @@
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import numpy as np
 
 TOTAL_LINES = 1_000_000
 ERROR_COUNT = 2
+BATCH_LINES = 100_000  # Lines formatted and written per batch
 
 log_levels = ["INFO", "DEBUG", "WARN"]
 components = ["AuthService", "DBService", "Cache", "API", "Scheduler", "Worker"]
@@ -30,19 +32,38 @@ error_messages = [
     "Database connection timeout",
 ]
 
-start_time = datetime.now()
+rng = np.random.default_rng()
+start_time = np.datetime64(datetime.now(), "s")
+
+# Every possible "LEVEL Component - message" body, so each line only needs a
+# lookup: regular bodies first, then one block per ERROR message
+bodies = np.array(
+    [f"{level} {component} - {msg}"
+     for level in log_levels for component in components for msg in messages[level]]
+    + [f"ERROR {component} - {msg}" for msg in error_messages for component in components]
+)
+
+# Draw level, component and message for all lines at once (uniform per
+# choice, like random.choice): the body index is the level's block start
+# plus component * messages-per-level + message
+level_sizes = np.array([len(messages[level]) for level in log_levels])
+level_offsets = np.concatenate(([0], np.cumsum(level_sizes * len(components))[:-1]))
+level = rng.integers(len(log_levels), size=TOTAL_LINES)
+component = rng.integers(len(components), size=TOTAL_LINES)
+msg = (rng.random(TOTAL_LINES) * level_sizes[level]).astype(np.int64)
+body_index = level_offsets[level] + component * level_sizes[level] + msg
 
 # Pick random lines for ERROR
-error_lines = set(random.sample(range(TOTAL_LINES), ERROR_COUNT))
+error_lines = rng.choice(TOTAL_LINES, size=ERROR_COUNT, replace=False)
+error_start = len(bodies) - len(error_messages) * len(components)
+body_index[error_lines] = (error_start
+                           + rng.integers(len(error_messages), size=ERROR_COUNT) * len(components)
+                           + component[error_lines])
 
 with open("system.log", "w") as f:
-    for i in range(TOTAL_LINES):
-        timestamp = (start_time + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")
-        component = random.choice(components)
-
-        if i in error_lines:
-            f.write(f"{timestamp} ERROR {component} - {random.choice(error_messages)}\n")
-        else:
-            level = random.choice(log_levels)
-            msg = random.choice(messages[level])
-            f.write(f"{timestamp} {level} {component} - {msg}\n")
+    for start in range(0, TOTAL_LINES, BATCH_LINES):
+        stop = min(start + BATCH_LINES, TOTAL_LINES)
+        # One second per line; ISO strings only need the "T" swapped for a space
+        timestamps = np.datetime_as_string(start_time + np.arange(start, stop), unit="s")
+        f.writelines(f"{ts[:10]} {ts[11:]} {body}\n"
+                     for ts, body in zip(timestamps.tolist(), bodies[body_index[start:stop]].tolist()))